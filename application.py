@@ -24,6 +24,7 @@ def create_app(test_config=None):
         SESSION_COOKIE_SECURE=True,
         SESSION_COOKIE_HTTPONLY=True,
         SESSION_COOKIE_SAMESITE="Lax",
+        SOLVER_NUM_WORKERS=None,  # None lets the solver size its worker pool
     )
     
     # Override with test config if provided
@@ -132,7 +133,9 @@ def create_app(test_config=None):
 
             is_valid_shifts, shift_error_msg = validate_shift_definitions(shift_definitions)
             if not is_valid_shifts:
-                print(f"Error: Invalid shift definitions - {shift_error_msg}")
+                logger.warning(
+                    f"[{request_id}] Invalid shift definitions - {shift_error_msg}"
+                )
                 return jsonify({"success": False, "message": shift_error_msg}), 400
 
             # *** Validate Staff List Structure and Priority List ***
@@ -204,6 +207,7 @@ def create_app(test_config=None):
                     shift_definitions,
                     shift_preference,
                     staff_priority_list,
+                    num_workers=app.config["SOLVER_NUM_WORKERS"],
                 )
             )
             logger.info(
@@ -11,6 +11,8 @@ DAYS_OF_WEEK = [
     "Sunday",
 ]
 
+DAY_INDEX = {day: d_idx for d_idx, day in enumerate(DAYS_OF_WEEK)}
+
 SHIFTS = {
     "HALF_DAY_AM": {"start": "11:00", "end": "16:00", "hours": 5.0},
     "HALF_DAY_PM": {"start": "16:00", "end": "21:00", "hours": 5.0},
@@ -16,8 +16,14 @@ import time
 import logging
 import os
 from ortools.sat.python import cp_model
-from .constants import DAYS_OF_WEEK
-from .utils import time_to_minutes, calculate_total_weekly_hours
+from .constants import DAYS_OF_WEEK, DAY_INDEX
+from .utils import (
+    build_staff_hour_index,
+    validate_schedule_shape,
+    build_shift_segments,
+    build_unavailability_index,
+    is_available,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +38,10 @@ def generate_schedule_with_ortools(
     shift_definitions,
     shift_preference="PRIORITIZE_FULL_DAYS",
     staff_priority_list=[],
+    num_workers=None,
+    max_time_ms=None,
+    random_seed=None,
+    hint_schedule=None,
 ):
     logger.info(
         f"[OR-Tools] Starting generation (Pref: {shift_preference}, Staff Prio: {len(staff_priority_list)})..."
@@ -78,8 +88,6 @@ def generate_schedule_with_ortools(
         logger.info("Warning: No active roles found.")
     logger.info(f"[OR-Tools] Active roles for this run: {defined_roles}")
 
-    max_possible_shortage = len(all_staff_ids) + 1
-
     # Validate role_priority_map roles against defined_roles
     role_priority_map = {
         k: v for k, v in role_priority_map.items() if k[1] in defined_roles
@@ -97,52 +105,98 @@ def generate_schedule_with_ortools(
     min_hour_shortage_tenths = {}
     total_weekly_hours_tenths = {}
 
+    # Shift durations only depend on shift_definitions, so resolve them once
+    shift_duration_by_type = {
+        st: int(shift_info.get("hours", 0) * 10)
+        for st, shift_info in shift_definitions.items()
+    }
+
+    # Collect (staff, day, shift) slots blocked by unavailability (HC3)
+    logger.info("[OR-Tools] Collecting unavailability blocks...")
+    unavailability_index = build_unavailability_index(unavailability_list)
+    shift_segments = build_shift_segments(shift_definitions)
+    blocked_slots = set()
+    for s_id, day in unavailability_index:
+        if s_id not in staff_map:
+            continue
+        d_idx = DAY_INDEX[day]
+        for st, segments in shift_segments.items():
+            if not is_available(s_id, day, segments, unavailability_index):
+                blocked_slots.add((s_id, d_idx, st))
+
+    # Roles each staff member can actually fill, in defined_roles order
+    staff_allowed_roles = {}
+    for s_id in all_staff_ids:
+        possible_roles = set(staff_map[s_id].get("assignedRolesInPriority") or [])
+        staff_allowed_roles[s_id] = [
+            role for role in defined_roles if role in possible_roles
+        ]
+
     # Create assign_vars (using defined_roles and keys from shift_definitions)
+    # and index them once by (staff, day, shift) and (day, shift, role) so
+    # constraint blocks do dict lookups instead of rescanning assign_vars
+    vars_by_staff_shift = {}  # {(s_id, d_idx, st): [var, ...]}
+    vars_by_slot = {}  # {(d_idx, st, role): [var, ...]}
     for s_id in all_staff_ids:
-        staff_data = staff_map[s_id]
-        possible_roles = staff_data.get("assignedRolesInPriority", [])
+        allowed_roles = staff_allowed_roles[s_id]
         for d_idx, day in enumerate(DAYS_OF_WEEK):
             for st in shift_definitions.keys():
-                for role in defined_roles:
-                    if role in possible_roles:
-                        assign_vars[(s_id, d_idx, st, role)] = model.NewBoolVar(
-                            f"assign_{s_id}_{day}_{st}_{role}"
-                        )
+                if (s_id, d_idx, st) in blocked_slots:
+                    continue
+                staff_shift_vars = vars_by_staff_shift.setdefault((s_id, d_idx, st), [])
+                for role in allowed_roles:
+                    var = model.NewBoolVar(f"assign_{s_id}_{day}_{st}_{role}")
+                    assign_vars[(s_id, d_idx, st, role)] = var
+                    staff_shift_vars.append(var)
+                    vars_by_slot.setdefault((d_idx, st, role), []).append(var)
 
     # Create shortage_vars (using defined_roles and keys from shift_definitions)
+    # Slots without demand get no shortage var; HC1 pins their assignments to 0
+    needed_counts = {}
     for d_idx, day in enumerate(DAYS_OF_WEEK):
         for st in shift_definitions.keys():
             for role in defined_roles:
-                shortage_vars[(d_idx, st, role)] = model.NewIntVar(
-                    0, max_possible_shortage, f"shortage_{day}_{st}_{role}"
-                )
+                needed_count = weekly_needs.get(day, {}).get(st, {}).get(role, 0)
+                needed_count = max(0, int(needed_count))
+                needed_counts[(d_idx, st, role)] = needed_count
+                if needed_count > 0:
+                    # Shortage can never exceed demand, and is at least the
+                    # demand no candidate staff member could cover
+                    candidate_count = len(vars_by_slot.get((d_idx, st, role), []))
+                    shortage_vars[(d_idx, st, role)] = model.NewIntVar(
+                        max(0, needed_count - candidate_count),
+                        needed_count,
+                        f"shortage_{day}_{st}_{role}",
+                    )
 
     # Create total_weekly_hours_tenths and min_hour_shortage_tenths vars
     for s_id, staff_data in staff_map.items():
-        weekly_hours_terms = []
+        # HC2 keeps each (day, shift) to at most one role, so the staff's
+        # assign vars can be weighted by shift duration directly
+        weekly_hours_vars = []
+        weekly_hours_coeffs = []
         for d_idx, day in enumerate(DAYS_OF_WEEK):
-            for st, shift_info in shift_definitions.items():
-                shift_duration_tenths = int(shift_info.get("hours", 0) * 10)
+            for st, shift_duration_tenths in shift_duration_by_type.items():
                 if shift_duration_tenths > 0:
-                    vars_for_shift_this_employee = [
-                        var
-                        for k, var in assign_vars.items()
-                        if k[0] == s_id and k[1] == d_idx and k[2] == st
-                    ]
-                    if vars_for_shift_this_employee:
-                        works_this_shift = model.NewBoolVar(f"works_{s_id}_{day}_{st}")
-                        model.AddMaxEquality(
-                            works_this_shift, vars_for_shift_this_employee
-                        )
-                        weekly_hours_terms.append(
-                            works_this_shift * shift_duration_tenths
-                        )
+                    vars_for_shift_this_employee = vars_by_staff_shift.get(
+                        (s_id, d_idx, st), []
+                    )
+                    weekly_hours_vars.extend(vars_for_shift_this_employee)
+                    weekly_hours_coeffs.extend(
+                        [shift_duration_tenths] * len(vars_for_shift_this_employee)
+                    )
         # Define total weekly hours variable
-        if weekly_hours_terms:
+        if weekly_hours_vars:
+            # Upper bound is the staff working every shift still open to them
             total_weekly_hours_tenths[s_id] = model.NewIntVar(
-                0, 7 * 24 * 10, f"total_hours_{s_id}"
+                0, sum(weekly_hours_coeffs), f"total_hours_{s_id}"
+            )
+            model.Add(
+                total_weekly_hours_tenths[s_id]
+                == cp_model.LinearExpr.WeightedSum(
+                    weekly_hours_vars, weekly_hours_coeffs
+                )
             )
-            model.Add(total_weekly_hours_tenths[s_id] == sum(weekly_hours_terms))
         else:
             total_weekly_hours_tenths[s_id] = model.NewConstant(0)
         # Define min hour shortage variable
@@ -150,7 +204,7 @@ def generate_schedule_with_ortools(
         min_hours_tenths_target = int(min_hours * 10) if min_hours else 0
         if min_hours_tenths_target > 0:
             shortage_var = model.NewIntVar(
-                0, min_hours_tenths_target + 10, f"min_short_{s_id}"
+                0, min_hours_tenths_target, f"min_short_{s_id}"
             )
             model.Add(
                 shortage_var
@@ -167,108 +221,37 @@ def generate_schedule_with_ortools(
     for d_idx, day in enumerate(DAYS_OF_WEEK):
         for st in shift_definitions.keys():
             for role in defined_roles:
-                needed_count = weekly_needs.get(day, {}).get(st, {}).get(role, 0)
-                needed_count = max(0, int(needed_count))
-                qualified_assign_vars = [
-                    var
-                    for k, var in assign_vars.items()
-                    if k[1] == d_idx and k[2] == st and k[3] == role
-                ]
+                needed_count = needed_counts[(d_idx, st, role)]
+                qualified_assign_vars = vars_by_slot.get((d_idx, st, role), [])
                 shortage_var = shortage_vars.get((d_idx, st, role))
                 if shortage_var is not None:
-                    model.Add(sum(qualified_assign_vars) + shortage_var == needed_count)
+                    model.Add(
+                        cp_model.LinearExpr.Sum(qualified_assign_vars) + shortage_var
+                        == needed_count
+                    )
+                elif qualified_assign_vars:
+                    model.Add(cp_model.LinearExpr.Sum(qualified_assign_vars) == 0)
 
     # HC2: Single Role Exclusion
     logger.info("[OR-Tools] Adding HARD constraint: Single assignment & exclusion...")
-    for s_id in all_staff_ids:
+    # Single-role staff have one var per (day, shift), which is trivially <= 1
+    multi_role_staff = [
+        s_id for s_id in all_staff_ids if len(staff_allowed_roles[s_id]) > 1
+    ]
+    for s_id in multi_role_staff:
         for d_idx, day in enumerate(DAYS_OF_WEEK):
-            # Max 1 role per base shift type (AM/PM)
-            for sk_base in ["HALF_DAY_AM", "HALF_DAY_PM"]:
-                if sk_base in shift_definitions.keys():
-                    vars_for_staff_base_shift = [
-                        var
-                        for k, var in assign_vars.items()
-                        if k[0] == s_id and k[1] == d_idx and k[2] == sk_base
-                    ]
-                    if len(vars_for_staff_base_shift) > 0:
-                        model.Add(sum(vars_for_staff_base_shift) <= 1)
-            # No additional exclusion needed since we only have HALF_DAY shifts
-
-    # HC3: Unavailability
-    logger.info("[OR-Tools] Adding HARD constraint: Unavailability...")
-    for unav in unavailability_list:
-        s_id = unav.get("employeeId")
-        day = unav.get("dayOfWeek")
-        shifts_unav = unav.get("shifts")
-        if (
-            not s_id
-            or s_id not in staff_map
-            or day not in DAYS_OF_WEEK
-            or not isinstance(shifts_unav, list)
-        ):
-            continue
-        d_idx = DAYS_OF_WEEK.index(day)
-        for unav_span in shifts_unav:
-            if (
-                not isinstance(unav_span, dict)
-                or "start" not in unav_span
-                or "end" not in unav_span
-            ):
-                continue
-            unav_start_min = time_to_minutes(unav_span["start"])
-            unav_end_min = time_to_minutes(unav_span["end"])
-            
-            # Handle cross-day unavailability (e.g., 19:00 to 02:00)
-            is_cross_day = (
-                unav_end_min <= unav_start_min
-                and not (unav_start_min == 0 and unav_end_min == 0)
-            )
-            
-            if unav_start_min < 0 or unav_end_min < 0:
-                continue
-                
-            for st, shift_info in shift_definitions.items():
-                shift_start_min = time_to_minutes(shift_info["start"])
-                shift_end_min = time_to_minutes(shift_info["end"])
-                if shift_start_min < 0 or shift_end_min < 0:
-                    continue
-                
-                # Check if this is a cross-day shift
-                is_cross_day_shift = shift_end_min <= shift_start_min
-                
-                # Check for overlap between unavailability and shift
-                overlap = False
-                
-                if is_cross_day and is_cross_day_shift:
-                    # Both unavailability and shift are cross-day
-                    # This means they both span midnight, so they definitely overlap
-                    overlap = True
-                elif is_cross_day and not is_cross_day_shift:
-                    # Cross-day unavailability vs same-day shift
-                    # Part 1: unav_start_min to midnight (1440) vs same-day shift
-                    overlap_part1 = (shift_start_min < 1440) and (unav_start_min < shift_end_min)
-                    # Part 2: midnight (0) to unav_end_min vs same-day shift
-                    overlap_part2 = (shift_start_min < unav_end_min) and (0 < shift_end_min)
-                    overlap = overlap_part1 or overlap_part2
-                elif not is_cross_day and is_cross_day_shift:
-                    # Same-day unavailability vs cross-day shift
-                    # Part 1: same-day unav vs shift_start_min to midnight
-                    overlap_part1 = (unav_start_min < 1440) and (shift_start_min < unav_end_min)
-                    # Part 2: same-day unav vs midnight to shift_end_min
-                    overlap_part2 = (unav_start_min < shift_end_min) and (0 < unav_end_min)
-                    overlap = overlap_part1 or overlap_part2
-                else:
-                    # Both same-day: standard overlap check
-                    overlap = (shift_start_min < unav_end_min) and (unav_start_min < shift_end_min)
-                
-                if overlap:
-                    for role in defined_roles:
-                        var = assign_vars.get((s_id, d_idx, st, role))
-                        if var is not None:
-                            model.Add(var == 0)
+            # Max 1 role per shift type
+            for st in shift_definitions.keys():
+                vars_for_staff_shift = vars_by_staff_shift.get((s_id, d_idx, st), [])
+                if len(vars_for_staff_shift) > 1:
+                    model.AddAtMostOne(vars_for_staff_shift)
+
+    # HC3: Unavailability is enforced by never creating assign_vars for
+    # blocked (staff, day, shift) slots (see section 3)
 
     # HC4: Max Weekly Hours
     logger.info("[OR-Tools] Adding HARD constraint: Max weekly hours...")
+    max_hours_tenths = {}
     for s_id, staff_data in staff_map.items():
         max_hours = staff_data.get("maxHoursPerWeek")
         if (
@@ -276,12 +259,69 @@ def generate_schedule_with_ortools(
             and isinstance(max_hours, (int, float))
             and max_hours >= 0
         ):
+            max_hours_tenths[s_id] = int(max_hours * 10)
             if s_id in total_weekly_hours_tenths:
-                model.Add(total_weekly_hours_tenths[s_id] <= int(max_hours * 10))
+                model.Add(total_weekly_hours_tenths[s_id] <= max_hours_tenths[s_id])
+
+    # --- Solution Hint ---
+    hint_values = dict.fromkeys(assign_vars, 0)
+    if isinstance(hint_schedule, dict):
+        # Warm start from a previous schedule (same output shape this function
+        # returns); assignments that no longer map to a variable are dropped
+        logger.info("[OR-Tools] Adding solution hint from previous schedule...")
+        for day, day_schedule in hint_schedule.items():
+            d_idx = DAY_INDEX.get(day)
+            if d_idx is None or not isinstance(day_schedule, dict):
+                continue
+            for st, roles_dict in day_schedule.items():
+                if not isinstance(roles_dict, dict):
+                    continue
+                for role, assigned_ids in roles_dict.items():
+                    if not isinstance(assigned_ids, (list, tuple)):
+                        continue
+                    for s_id in assigned_ids:
+                        if not isinstance(s_id, str):
+                            continue
+                        key = (s_id, d_idx, st, role)
+                        if key in assign_vars:
+                            hint_values[key] = 1
+    else:
+        # Fill each demand slot with the first qualified, available staff
+        # member (staff priority order first) who is still free that shift and
+        # under max hours. This hands CP-SAT a feasible starting point.
+        logger.info("[OR-Tools] Adding greedy solution hint...")
+        prioritized_staff_ids = list(
+            dict.fromkeys(
+                [s_id for s_id in staff_priority_list if s_id in staff_map]
+                + all_staff_ids
+            )
+        )
+        hint_hours_tenths = dict.fromkeys(all_staff_ids, 0)
+        hint_busy_shifts = set()  # {(s_id, d_idx, st)}
+        for (d_idx, st, role), needed_count in needed_counts.items():
+            filled_count = 0
+            for s_id in prioritized_staff_ids:
+                if filled_count >= needed_count:
+                    break
+                key = (s_id, d_idx, st, role)
+                if key not in assign_vars or (s_id, d_idx, st) in hint_busy_shifts:
+                    continue
+                new_hours_tenths = hint_hours_tenths[s_id] + shift_duration_by_type[st]
+                if new_hours_tenths > max_hours_tenths.get(s_id, new_hours_tenths):
+                    continue
+                hint_values[key] = 1
+                hint_hours_tenths[s_id] = new_hours_tenths
+                hint_busy_shifts.add((s_id, d_idx, st))
+                filled_count += 1
+    for key, value in hint_values.items():
+        model.AddHint(assign_vars[key], value)
 
     # --- 5. Define Optimization Objective ---
     logger.info("[OR-Tools] Defining optimization objectives...")
-    objective_terms = []
+    # Objective is one flat WeightedSum over (variable, weight) pairs; no
+    # intermediate total vars are needed as the terms only feed the objective
+    objective_vars = []
+    objective_weights = []
     WEIGHT_DEMAND_SHORTAGE = 10000
     WEIGHT_MIN_HOUR_SHORTAGE = 2000
     WEIGHT_SHIFT_PREFERENCE = 100
@@ -289,41 +329,37 @@ def generate_schedule_with_ortools(
     WEIGHT_ROLE_PREFERENCE = 10
 
     # Obj 1: Minimize Demand Shortage
-    total_shortage = sum(shortage_vars.values())
-    objective_terms.append(-total_shortage * WEIGHT_DEMAND_SHORTAGE)
+    objective_vars.extend(shortage_vars.values())
+    objective_weights.extend([-WEIGHT_DEMAND_SHORTAGE] * len(shortage_vars))
     logger.info(f"  - Added: Minimize Demand Shortage (weight: {WEIGHT_DEMAND_SHORTAGE})")
 
     # Obj 2: Minimize Min Weekly Hours Shortage
-    total_min_hour_shortage = sum(min_hour_shortage_tenths.values())
-    objective_terms.append(-total_min_hour_shortage * WEIGHT_MIN_HOUR_SHORTAGE)
+    objective_vars.extend(min_hour_shortage_tenths.values())
+    objective_weights.extend(
+        [-WEIGHT_MIN_HOUR_SHORTAGE] * len(min_hour_shortage_tenths)
+    )
     logger.info(f"  - Added: Minimize Min Hour Shortage (weight: {WEIGHT_MIN_HOUR_SHORTAGE})")
 
     # Obj 3: Handle Shift Preference
     if shift_preference == "PRIORITIZE_FULL_DAYS":
         full_day_bonuses = []
         for s_id in all_staff_ids:
-            staff_roles = staff_map[s_id].get("assignedRolesInPriority", [])
             for d_idx, day in enumerate(DAYS_OF_WEEK):
-                for role in staff_roles:
-                    if role in defined_roles:
-                        var_am = assign_vars.get((s_id, d_idx, "HALF_DAY_AM", role))
-                        var_pm = assign_vars.get((s_id, d_idx, "HALF_DAY_PM", role))
-                        if var_am is not None and var_pm is not None:
-                            works_full_day_role = model.NewBoolVar(
-                                f"full_day_{s_id}_{day}_{role}"
-                            )
-                            model.AddBoolAnd([var_am, var_pm]).OnlyEnforceIf(
-                                works_full_day_role
-                            )
-                            model.AddImplication(works_full_day_role, var_am)
-                            model.AddImplication(works_full_day_role, var_pm)
-                            full_day_bonuses.append(works_full_day_role)
+                for role in staff_allowed_roles[s_id]:
+                    var_am = assign_vars.get((s_id, d_idx, "HALF_DAY_AM", role))
+                    var_pm = assign_vars.get((s_id, d_idx, "HALF_DAY_PM", role))
+                    if var_am is not None and var_pm is not None:
+                        works_full_day_role = model.NewBoolVar(
+                            f"full_day_{s_id}_{day}_{role}"
+                        )
+                        # Upper bounds suffice: the positive objective
+                        # weight drives the bonus to 1 when both hold
+                        model.AddImplication(works_full_day_role, var_am)
+                        model.AddImplication(works_full_day_role, var_pm)
+                        full_day_bonuses.append(works_full_day_role)
         if full_day_bonuses:
-            total_full_days = model.NewIntVar(
-                0, len(full_day_bonuses) + 1, "total_implied_full_days"
-            )
-            model.Add(total_full_days == sum(full_day_bonuses))
-            objective_terms.append(total_full_days * WEIGHT_SHIFT_PREFERENCE)
+            objective_vars.extend(full_day_bonuses)
+            objective_weights.extend([WEIGHT_SHIFT_PREFERENCE] * len(full_day_bonuses))
             logger.info(
                 f"  - Added: Maximize Implied Full Days (weight {WEIGHT_SHIFT_PREFERENCE})"
             )
@@ -331,36 +367,22 @@ def generate_schedule_with_ortools(
         half_day_indicators = []
         for s_id in all_staff_ids:
             for d_idx in range(len(DAYS_OF_WEEK)):
-                works_am_vars = [
-                    v
-                    for k, v in assign_vars.items()
-                    if k[0] == s_id and k[1] == d_idx and k[2] == "HALF_DAY_AM"
-                ]
-                works_pm_vars = [
-                    v
-                    for k, v in assign_vars.items()
-                    if k[0] == s_id and k[1] == d_idx and k[2] == "HALF_DAY_PM"
-                ]
+                works_am_vars = vars_by_staff_shift.get((s_id, d_idx, "HALF_DAY_AM"), [])
+                works_pm_vars = vars_by_staff_shift.get((s_id, d_idx, "HALF_DAY_PM"), [])
                 works_am = model.NewBoolVar(f"works_am_{s_id}_{d_idx}")
                 works_pm = model.NewBoolVar(f"works_pm_{s_id}_{d_idx}")
-                if works_am_vars:
-                    model.AddMaxEquality(works_am, works_am_vars)
-                else:
-                    model.Add(works_am == 0)
-                if works_pm_vars:
-                    model.AddMaxEquality(works_pm, works_pm_vars)
-                else:
-                    model.Add(works_pm == 0)
+                # HC2 allows at most one role per shift, so the sum is 0/1
+                model.Add(works_am == cp_model.LinearExpr.Sum(works_am_vars))
+                model.Add(works_pm == cp_model.LinearExpr.Sum(works_pm_vars))
                 works_half_day = model.NewBoolVar(f"half_day_{s_id}_{d_idx}")
                 model.Add(works_am + works_pm == 1).OnlyEnforceIf(works_half_day)
                 model.Add(works_am + works_pm != 1).OnlyEnforceIf(works_half_day.Not())
                 half_day_indicators.append(works_half_day)
         if half_day_indicators:
-            total_half_days = model.NewIntVar(
-                0, len(half_day_indicators) + 1, "total_half_days"
+            objective_vars.extend(half_day_indicators)
+            objective_weights.extend(
+                [WEIGHT_SHIFT_PREFERENCE] * len(half_day_indicators)
             )
-            model.Add(total_half_days == sum(half_day_indicators))
-            objective_terms.append(total_half_days * WEIGHT_SHIFT_PREFERENCE)
             logger.info(
                 f"  - Added: Maximize Half Day Assignments (weight {WEIGHT_SHIFT_PREFERENCE})"
             )
@@ -370,7 +392,6 @@ def generate_schedule_with_ortools(
         logger.info(
             f"  - Added: Prioritize Staff Hours based on list order (weight {WEIGHT_STAFF_PRIORITY})"
         )
-        staff_priority_objective = []
         max_prio = len(staff_priority_list)
         staff_prio_map = {
             s_id: max_prio - i for i, s_id in enumerate(staff_priority_list)
@@ -379,31 +400,26 @@ def generate_schedule_with_ortools(
         for s_id in all_staff_ids:
             priority_score = staff_prio_map.get(s_id, default_prio)
             if priority_score > 0 and s_id in total_weekly_hours_tenths:
-                staff_priority_objective.append(
-                    total_weekly_hours_tenths[s_id] * priority_score
-                )
-        if staff_priority_objective:
-            objective_terms.append(
-                sum(staff_priority_objective) * WEIGHT_STAFF_PRIORITY
-            )
+                objective_vars.append(total_weekly_hours_tenths[s_id])
+                objective_weights.append(priority_score * WEIGHT_STAFF_PRIORITY)
 
     # Obj 5: Handle Role Preference (based on role_priority_map derived from assignedRolesInPriority)
     if role_priority_map:
         logger.info(
             f"  - Added: Prioritize Staff Role Preference (weight {WEIGHT_ROLE_PREFERENCE})"
         )
-        role_preference_bonus = []
         for (s_id, d_idx, st, role), var in assign_vars.items():
             if role in defined_roles:
                 priority_score = role_priority_map.get((s_id, role), 0)
                 if priority_score > 0 and var is not None:
-                    role_preference_bonus.append(var * priority_score)
-        if role_preference_bonus:
-            objective_terms.append(sum(role_preference_bonus) * WEIGHT_ROLE_PREFERENCE)
+                    objective_vars.append(var)
+                    objective_weights.append(priority_score * WEIGHT_ROLE_PREFERENCE)
 
     # Set combined objective
-    if objective_terms:
-        model.Maximize(sum(objective_terms))
+    if objective_vars:
+        model.Maximize(
+            cp_model.LinearExpr.WeightedSum(objective_vars, objective_weights)
+        )
         logger.info("[OR-Tools] Combined objective function set.")
     else:
         logger.info("[OR-Tools] No specific optimization objectives enabled.")
@@ -412,11 +428,22 @@ def generate_schedule_with_ortools(
     solver = cp_model.CpSolver()
 
     # Performance optimization parameters
-    solver.parameters.max_time_in_seconds = 180.0
-    # Optimize worker count based on CPU cores
-    max_workers = min(os.cpu_count() or 4, 8)  # Use CPU cores, max 8
+    # Callers may tighten the 180s budget (e.g. tests bounding their runtime)
+    if isinstance(max_time_ms, (int, float)) and max_time_ms > 0:
+        solver.parameters.max_time_in_seconds = max_time_ms / 1000.0
+    else:
+        solver.parameters.max_time_in_seconds = 180.0
+    if isinstance(random_seed, int):
+        solver.parameters.random_seed = random_seed
+    # Optimize worker count based on CPU cores unless the caller pins it
+    # (e.g. one worker per solve when several solves already run in parallel)
+    if isinstance(num_workers, int) and num_workers > 0:
+        max_workers = num_workers
+    else:
+        max_workers = min(os.cpu_count() or 4, 8)  # Use CPU cores, max 8
     solver.parameters.num_search_workers = max_workers
-    solver.parameters.log_search_progress = True
+    # Per-worker search log is verbose, only emit it when debugging
+    solver.parameters.log_search_progress = logger.isEnabledFor(logging.DEBUG)
     solver.parameters.cp_model_presolve = True
     solver.parameters.cp_model_probing_level = 2
     solver.parameters.linearization_level = 2
@@ -436,45 +463,39 @@ def generate_schedule_with_ortools(
     warnings = []
     if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
         logger.info("[OR-Tools] Solution found. Building schedule dictionary...")
+        if status == cp_model.FEASIBLE:
+            # Search stopped on the time limit before optimality was proven
+            warning_msg = "Note: Solver time limit reached; schedule is feasible but may not be optimal."
+            warnings.append(warning_msg)
+            logger.warning(f"[OR-Tools] {warning_msg}")
         schedule = {}
         for day in DAYS_OF_WEEK:
             schedule[day] = {}
             for st in shift_definitions.keys():
                 schedule[day][st] = {}
 
-        for (s_id, d_idx, st, role), var in assign_vars.items():
-            if (
-                var is not None
-                and st in shift_definitions.keys()
-                and role in defined_roles
-            ):
-                if solver.Value(var) == 1:
-                    day = DAYS_OF_WEEK[d_idx]
-                    if day not in schedule:
-                        schedule[day] = {}
-                    if st not in schedule[day]:
-                        schedule[day][st] = {}
-                    if role not in schedule[day][st]:
-                        schedule[day][st][role] = []
-                    if s_id not in schedule[day][st][role]:
-                        schedule[day][st][role].append(s_id)
+        # Read all assignment values in one pass instead of per-key lookups
+        assign_keys = list(assign_vars.keys())
+        assign_values = [solver.BooleanValue(var) for var in assign_vars.values()]
+        for (s_id, d_idx, st, role), is_assigned in zip(assign_keys, assign_values):
+            if is_assigned:
+                day = DAYS_OF_WEEK[d_idx]
+                assigned_list = schedule[day][st].setdefault(role, [])
+                if s_id not in assigned_list:
+                    assigned_list.append(s_id)
 
         # Check for shortages
         logger.info("[OR-Tools] Checking for shortages...")
         final_total_shortage = 0
-        for (d_idx, st, role), var in shortage_vars.items():
-            if (
-                var is not None
-                and st in shift_definitions.keys()
-                and role in defined_roles
-            ):
-                shortage_amount = solver.Value(var)
-                if shortage_amount > 0:
-                    day = DAYS_OF_WEEK[d_idx]
-                    warning_msg = f"Warning: Shortage of {shortage_amount} for {role} on {day} {st}."
-                    warnings.append(warning_msg)
-                    logger.warning(warning_msg)
-                    final_total_shortage += shortage_amount
+        shortage_keys = list(shortage_vars.keys())
+        shortage_values = [solver.Value(var) for var in shortage_vars.values()]
+        for (d_idx, st, role), shortage_amount in zip(shortage_keys, shortage_values):
+            if shortage_amount > 0:
+                day = DAYS_OF_WEEK[d_idx]
+                warning_msg = f"Warning: Shortage of {shortage_amount} for {role} on {day} {st}."
+                warnings.append(warning_msg)
+                logger.warning(warning_msg)
+                final_total_shortage += shortage_amount
         if final_total_shortage > 0:
             logger.info(f"[OR-Tools] Total shortages found: {final_total_shortage}")
         else:
@@ -492,8 +513,16 @@ def generate_schedule_with_ortools(
                 del schedule[day]
         logger.info("[OR-Tools] Schedule dictionary built and cleaned.")
 
+        # Validate the shape once here so downstream hour helpers can trust it
+        is_valid_shape, shape_error = validate_schedule_shape(schedule)
+        if not is_valid_shape:
+            logger.error(f"[OR-Tools] Built schedule is malformed: {shape_error}")
+            warnings.append(f"Error: Generated schedule is malformed ({shape_error}).")
+            return None, warnings, calculation_time_ms
+
         # Post-check for minimum weekly hours
         logger.info("[OR-Tools] Performing post-check for minimum weekly hours...")
+        hours_by_staff = build_staff_hour_index(schedule, shift_definitions)
         for s_id, staff_data in staff_map.items():
             min_hours = staff_data.get("minHoursPerWeek")
             if (
@@ -501,9 +530,7 @@ def generate_schedule_with_ortools(
                 and isinstance(min_hours, (int, float))
                 and min_hours > 0
             ):
-                total_weekly_hours = calculate_total_weekly_hours(
-                    s_id, schedule, shift_definitions
-                )
+                total_weekly_hours = hours_by_staff.get(s_id, 0.0)
                 scheduled_at_all = total_weekly_hours > 0
                 tolerance = 0.01
                 if scheduled_at_all and total_weekly_hours < min_hours - tolerance:
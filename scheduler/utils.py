@@ -1,25 +1,52 @@
 # scheduler/utils.py
+import functools
 import logging
-from .constants import SHIFT_TYPES, DAYS_OF_WEEK, SHIFTS as DEFAULT_SHIFTS
+from .constants import SHIFT_TYPES, DAYS_OF_WEEK, DAY_INDEX, SHIFTS as DEFAULT_SHIFTS
 
 logger = logging.getLogger(__name__)
 
+__all__ = [
+    "time_to_minutes",
+    "calculate_cross_day_duration_hours",
+    "cross_day_duration_hours_from_minutes",
+    "calculate_daily_hours",
+    "freeze_schedule",
+    "validate_shift_definitions",
+    "validate_schedule_shape",
+    "calculate_total_weekly_hours",
+    "build_staff_hour_index",
+    "time_span_segments",
+    "build_shift_segments",
+    "build_unavailability_index",
+    "is_available",
+]
+
 
 def time_to_minutes(time_str):
     """Convert time string (HH:MM) to minutes since midnight."""
-    if not time_str or ":" not in time_str:
+    if not isinstance(time_str, str):
         logger.warning(f"Invalid time format: {time_str}")
         return -1
+    minutes, error_msg = _parse_time_to_minutes(time_str)
+    if error_msg:
+        # Logged here rather than in the cached parser so repeats still warn
+        logger.warning(error_msg)
+    return minutes
+
+
+@functools.lru_cache(maxsize=512)
+def _parse_time_to_minutes(time_str):
+    """Parse an HH:MM string into (minutes, error_message); cached per string."""
+    if not time_str or ":" not in time_str:
+        return -1, f"Invalid time format: {time_str}"
     try:
         hours, minutes = map(int, time_str.split(":"))
         if 0 <= hours <= 23 and 0 <= minutes <= 59:
-            return hours * 60 + minutes
+            return hours * 60 + minutes, None
         else:
-            logger.warning(f"Time out of range: {time_str}")
-            return -1
+            return -1, f"Time out of range: {time_str}"
     except ValueError as e:
-        logger.warning(f"Time parsing error for '{time_str}': {e}")
-        return -1
+        return -1, f"Time parsing error for '{time_str}': {e}"
 
 
 def calculate_cross_day_duration_hours(start_time, end_time):
@@ -33,9 +60,21 @@ def calculate_cross_day_duration_hours(start_time, end_time):
         float: Duration in hours. For cross-day times (e.g., 19:00 to 02:00), 
                calculates the actual duration (7 hours in this case)
     """
-    start_minutes = time_to_minutes(start_time)
-    end_minutes = time_to_minutes(end_time)
+    return cross_day_duration_hours_from_minutes(
+        time_to_minutes(start_time), time_to_minutes(end_time)
+    )
+
+
+def cross_day_duration_hours_from_minutes(start_minutes, end_minutes):
+    """Calculate duration in hours between two minute offsets, handling cross-day.
     
+    Args:
+        start_minutes (int): Start time in minutes since midnight
+        end_minutes (int): End time in minutes since midnight
+        
+    Returns:
+        float: Duration in hours, or 0.0 if either time is invalid (negative)
+    """
     if start_minutes < 0 or end_minutes < 0:
         return 0.0
     
@@ -81,11 +120,45 @@ def calculate_daily_hours(employee_id, day_of_week, schedule, shift_definitions)
             and isinstance(shift_info.get("hours"), (int, float))
         ):
             for role, assigned_list in roles_dict.items():
-                if isinstance(assigned_list, list) and employee_id in assigned_list:
+                if (
+                    isinstance(assigned_list, (list, frozenset))
+                    and employee_id in assigned_list
+                ):
                     total_hours += shift_info["hours"]
     return total_hours
 
 
+def freeze_schedule(schedule):
+    """Copy a schedule with each assigned-staff list turned into a frozenset.
+    
+    Hour lookups against the frozen copy test membership in O(1) instead of
+    scanning every role list, which pays off when totals are needed for many
+    employees of the same schedule.
+    
+    Args:
+        schedule (dict): Complete schedule dictionary
+        
+    Returns:
+        dict: Schedule with the same day/shift/role nesting and frozenset
+              leaves; malformed branches are dropped
+    """
+    if not isinstance(schedule, dict):
+        return {}
+    return {
+        day: {
+            shift_type: {
+                role: frozenset(assigned_list)
+                for role, assigned_list in roles_dict.items()
+                if isinstance(assigned_list, list)
+            }
+            for shift_type, roles_dict in day_schedule.items()
+            if isinstance(roles_dict, dict)
+        }
+        for day, day_schedule in schedule.items()
+        if isinstance(day_schedule, dict)
+    }
+
+
 def validate_shift_definitions(shift_defs):
     """Validate shift definitions structure and time consistency.
     
@@ -97,7 +170,7 @@ def validate_shift_definitions(shift_defs):
     """
     if not isinstance(shift_defs, dict):
         return False, "shiftDefinitions must be an object."
-    if not all(key in shift_defs for key in SHIFT_TYPES):
+    if not shift_defs.keys() >= set(SHIFT_TYPES):
         return (
             False,
             "Missing required shift types (HALF_DAY_AM, HALF_DAY_PM).",
@@ -112,25 +185,23 @@ def validate_shift_definitions(shift_defs):
             isinstance(t, str) and len(t) == 5 and t[2] == ":" for t in times_to_check
         ):
             return False, "Invalid time format (must be HH:MM)."
+        am_start_min, am_end_min, pm_start_min, pm_end_min = map(
+            time_to_minutes, times_to_check
+        )
         # Check times are valid minutes
-        if (
-            time_to_minutes(am_start) < 0
-            or time_to_minutes(am_end) < 0
-            or time_to_minutes(pm_start) < 0
-            or time_to_minutes(pm_end) < 0
-        ):
+        if min(am_start_min, am_end_min, pm_start_min, pm_end_min) < 0:
             return False, "Invalid time value in shift definitions."
         # Check start < end (AM shifts must be same-day)
-        if time_to_minutes(am_start) >= time_to_minutes(am_end):
+        if am_start_min >= am_end_min:
             return False, "AM start must be before AM end."
         
         # PM shifts can be cross-day, so only validate if they appear to be same-day
-        pm_start_min = time_to_minutes(pm_start)
-        pm_end_min = time_to_minutes(pm_end)
         if pm_start_min >= pm_end_min:
             # This is a cross-day PM shift (e.g., 22:00 to 06:00), which is valid
             # Calculate duration to ensure it's reasonable (not more than 12 hours)
-            cross_day_duration = calculate_cross_day_duration_hours(pm_start, pm_end)
+            cross_day_duration = cross_day_duration_hours_from_minutes(
+                pm_start_min, pm_end_min
+            )
             if cross_day_duration <= 0 or cross_day_duration > 12:
                 return False, "Invalid cross-day PM shift duration (must be between 0-12 hours)."
         # Same-day PM shift validation is implicit (start < end already checked above)
@@ -146,6 +217,32 @@ def validate_shift_definitions(shift_defs):
     return True, None  # Validation passed
 
 
+def validate_schedule_shape(schedule):
+    """Validate the day -> shift -> role -> assigned staff nesting of a schedule.
+    
+    Args:
+        schedule (dict): Complete schedule dictionary
+        
+    Returns:
+        tuple: (bool, str|None) - (is_valid, error_message)
+    """
+    if not isinstance(schedule, dict):
+        return False, "Schedule must be an object."
+    for day, day_schedule in schedule.items():
+        if not isinstance(day_schedule, dict):
+            return False, f"Schedule for {day} must be an object."
+        for shift_type, roles_dict in day_schedule.items():
+            if not isinstance(roles_dict, dict):
+                return False, f"Schedule for {day} {shift_type} must be an object."
+            for role, assigned_list in roles_dict.items():
+                if not isinstance(assigned_list, (list, frozenset)):
+                    return (
+                        False,
+                        f"Assigned staff for {role} on {day} {shift_type} must be a list.",
+                    )
+    return True, None
+
+
 def calculate_total_weekly_hours(employee_id, schedule, current_shifts_definitions):
     """Calculate total weekly hours for an employee across all days.
     
@@ -165,3 +262,163 @@ def calculate_total_weekly_hours(employee_id, schedule, current_shifts_definitio
             employee_id, day, schedule, current_shifts_definitions
         )
     return total_hours
+
+
+def build_staff_hour_index(schedule, shift_definitions):
+    """Calculate total weekly hours for every employee in one schedule pass.
+    
+    Args:
+        schedule (dict): Complete schedule dictionary
+        shift_definitions (dict): Shift definitions with hours
+        
+    Returns:
+        dict: Mapping of employee ID to total weekly hours worked
+    """
+    hours_by_staff = {}
+    current_shifts = (
+        shift_definitions if isinstance(shift_definitions, dict) else DEFAULT_SHIFTS
+    )
+    if not isinstance(schedule, dict):
+        return hours_by_staff
+
+    for day in DAYS_OF_WEEK:
+        day_schedule = schedule.get(day)
+        if not isinstance(day_schedule, dict):
+            continue
+        for shift_type, roles_dict in day_schedule.items():
+            shift_info = current_shifts.get(shift_type)
+            if (
+                not shift_info
+                or not isinstance(roles_dict, dict)
+                or not isinstance(shift_info.get("hours"), (int, float))
+            ):
+                continue
+            for assigned_list in roles_dict.values():
+                if isinstance(assigned_list, (list, frozenset)):
+                    for employee_id in assigned_list:
+                        hours_by_staff[employee_id] = (
+                            hours_by_staff.get(employee_id, 0.0) + shift_info["hours"]
+                        )
+    return hours_by_staff
+
+
+def time_span_segments(start_minutes, end_minutes):
+    """Split a time span into same-day [start, end) minute segments.
+    
+    A span whose end is at or before its start crosses midnight and is split
+    into [start, 1440) and [0, end), so overlap checks never need to special
+    case cross-day spans.
+    
+    Args:
+        start_minutes (int): Span start in minutes since midnight
+        end_minutes (int): Span end in minutes since midnight
+        
+    Returns:
+        tuple: Tuple of (start_min, end_min) segments, empty if either bound
+               is invalid
+    """
+    if start_minutes < 0 or end_minutes < 0:
+        return ()
+    if end_minutes <= start_minutes:
+        return ((start_minutes, 1440), (0, end_minutes))
+    return ((start_minutes, end_minutes),)
+
+
+def build_shift_segments(shift_definitions):
+    """Resolve each shift definition to its minute segments once.
+    
+    Args:
+        shift_definitions (dict): Shift definitions with 'start' and 'end'
+        
+    Returns:
+        dict: Mapping of shift type to its time_span_segments tuple
+    """
+    return {
+        shift_type: time_span_segments(
+            time_to_minutes(shift_info.get("start")),
+            time_to_minutes(shift_info.get("end")),
+        )
+        for shift_type, shift_info in shift_definitions.items()
+    }
+
+
+def build_unavailability_index(unavailability_list):
+    """Group unavailability by employee and day as pre-parsed minute segments.
+    
+    Malformed records and spans are skipped, and every "HH:MM" string is
+    parsed here exactly once, so availability checks only compare integers.
+    
+    Args:
+        unavailability_list (list): Unavailability records from the request
+        
+    Returns:
+        dict: Mapping of (employee_id, day_of_week) to a sorted list of
+              disjoint (start_min, end_min) same-day segments
+    """
+    unavailability_index = {}
+    if not isinstance(unavailability_list, list):
+        return unavailability_index
+    for item in unavailability_list:
+        if not isinstance(item, dict):
+            continue
+        employee_id = item.get("employeeId")
+        day_of_week = item.get("dayOfWeek")
+        spans = item.get("shifts")
+        if (
+            not employee_id
+            or day_of_week not in DAY_INDEX
+            or not isinstance(spans, list)
+        ):
+            continue
+        segments = unavailability_index.setdefault((employee_id, day_of_week), [])
+        for span in spans:
+            if not isinstance(span, dict) or "start" not in span or "end" not in span:
+                continue
+            unav_start_min = time_to_minutes(span["start"])
+            unav_end_min = time_to_minutes(span["end"])
+            # A 00:00-00:00 span blocks nothing rather than the whole day
+            if unav_start_min == 0 and unav_end_min == 0:
+                continue
+            segments.extend(time_span_segments(unav_start_min, unav_end_min))
+    for key, segments in unavailability_index.items():
+        unavailability_index[key] = _merge_segments(segments)
+    return unavailability_index
+
+
+def _merge_segments(segments):
+    """Sort minute segments and merge any that overlap or touch."""
+    merged = []
+    for start_min, end_min in sorted(segments):
+        if start_min >= end_min:
+            continue
+        if merged and start_min <= merged[-1][1]:
+            if end_min > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end_min)
+        else:
+            merged.append((start_min, end_min))
+    return merged
+
+
+def is_available(employee_id, day_of_week, shift_segments, unavailability_index):
+    """Check whether an employee can work a shift on a given day.
+    
+    Args:
+        employee_id (str): Employee ID
+        day_of_week (str): Day name (e.g., 'Monday')
+        shift_segments (tuple): Shift minute segments from time_span_segments
+        unavailability_index (dict): Output of build_unavailability_index
+        
+    Returns:
+        bool: False if any unavailability segment overlaps the shift
+    """
+    unavailable_segments = unavailability_index.get((employee_id, day_of_week))
+    if not unavailable_segments:
+        return True
+    for shift_start_min, shift_end_min in shift_segments:
+        for unav_start_min, unav_end_min in unavailable_segments:
+            # Segments are sorted, so nothing later can reach into the shift
+            if unav_start_min >= shift_end_min:
+                break
+            if shift_start_min < unav_end_min:
+                return False
+    return True
@@ -1,26 +1,101 @@
 """
 Shared test configuration and fixtures for restaurant scheduling backend.
 """
+import os
 import pytest
 import json
 from flask import Flask
 from application import create_app
+from scheduler.solver import generate_schedule_with_ortools
+from fixtures.test_data import get_basic_scenario
+from fixtures.schedule_validator import ScheduleValidator
 
 
-@pytest.fixture
+def pytest_configure(config):
+    """Register custom markers."""
+    config.addinivalue_line(
+        "markers", "slow: solver-heavy test; deselect with -m \"not slow\" for a fast run"
+    )
+    # Registered by pytest-xdist when installed; keeps plain runs warning-free
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run tests with this name on one xdist worker"
+    )
+
+
+@pytest.fixture(scope="session")
 def app():
-    """Create Flask application for testing."""
-    app = create_app()
+    """Create Flask application for testing (shared across the session).
+    
+    Under pytest-xdist, API-driven solves are pinned to one CP-SAT worker
+    like the direct ones in the solve fixture.
+    """
+    app = create_app({
+        "SOLVER_NUM_WORKERS": 1 if os.environ.get("PYTEST_XDIST_WORKER") else None
+    })
     app.config['TESTING'] = True
     return app
 
 
-@pytest.fixture  
+@pytest.fixture(scope="session")
 def client(app):
-    """Create test client."""
+    """Create test client (requests carry no session state between tests)."""
     return app.test_client()
 
 
+@pytest.fixture(scope="module")
+def basic_scenario():
+    """Basic scenario shared by tests that only read it."""
+    return get_basic_scenario()
+
+
+@pytest.fixture(scope="session")
+def solve():
+    """Run the solver on a scenario dict.
+    
+    Under pytest-xdist every worker already solves in parallel, so each
+    CP-SAT call is pinned to one search worker to avoid oversubscribing cores.
+    """
+    def _solve(scenario, **solver_kwargs):
+        if os.environ.get("PYTEST_XDIST_WORKER"):
+            solver_kwargs.setdefault("num_workers", 1)
+        return generate_schedule_with_ortools(
+            scenario["weeklyNeeds"],
+            scenario["staffList"],
+            scenario["unavailabilityList"],
+            scenario["shiftDefinitions"],
+            scenario["shiftPreference"],
+            scenario["staffPriority"],
+            **solver_kwargs
+        )
+    return _solve
+
+
+@pytest.fixture(scope="session")
+def solved_basic(solve):
+    """Solve the basic scenario once per session.
+    
+    Returns the (schedule, warnings, calc_time_ms) triple; tests must treat it
+    as read-only since every caller shares the same objects. The solve is
+    capped at 8s; test_performance_within_bounds fails if it hits the cap,
+    since a capped solve may hand the quality tests a non-optimal schedule.
+    """
+    return solve(get_basic_scenario(), max_time_ms=8000)
+
+
+@pytest.fixture(scope="session")
+def staff_by_id():
+    """Map staff ID to staff dict for the basic scenario, built once per session."""
+    return {staff["id"]: staff for staff in get_basic_scenario()["staffList"]}
+
+
+@pytest.fixture(scope="session")
+def basic_violations(solved_basic):
+    """Hard-constraint violations of the shared basic schedule, by kind."""
+    schedule, _, _ = solved_basic
+    assert schedule is not None, "Basic scenario should produce a schedule"
+    return ScheduleValidator(schedule, get_basic_scenario()).violations
+
+
 @pytest.fixture
 def sample_staff():
     """Sample staff data for testing."""
@@ -0,0 +1,69 @@
+"""
+Post-solve hard-constraint checks for generated schedules.
+Walks a schedule once and collects every violation by category.
+"""
+from collections import defaultdict
+
+VIOLATION_KINDS = ("double_booking", "max_hours", "qualification", "unavailability")
+
+
+class ScheduleValidator:
+    """Collect hard-constraint violations of a schedule against its scenario.
+
+    Violations are grouped in ``self.violations`` under the keys of
+    VIOLATION_KINDS, each holding a list of human-readable messages.
+    Double booking means holding two roles in the same (day, shift); working
+    both halves of a day is a legitimate full day. Unavailability is checked
+    per whole day: anyone with an unavailability entry for a day must not
+    appear anywhere on that day.
+    """
+
+    def __init__(self, schedule, scenario):
+        self.schedule = schedule
+        self.staff_by_id = {staff["id"]: staff for staff in scenario["staffList"]}
+        self.shift_hours = {
+            shift_type: info["hours"]
+            for shift_type, info in scenario["shiftDefinitions"].items()
+        }
+        self.unavail_by_day = defaultdict(set)
+        for unavail in scenario["unavailabilityList"]:
+            self.unavail_by_day[unavail["dayOfWeek"]].add(unavail["employeeId"])
+        self.violations = self.validate_all()
+
+    def validate_all(self):
+        """Walk the schedule once and return violations grouped by kind."""
+        violations = {kind: [] for kind in VIOLATION_KINDS}
+        hours_by_staff = defaultdict(float)
+
+        for day, day_schedule in self.schedule.items():
+            unavailable = self.unavail_by_day.get(day, ())
+            for shift_type, shift_schedule in day_schedule.items():
+                booked = {}  # staff_id -> role already held this (day, shift)
+                hours = self.shift_hours.get(shift_type, 0)
+                for role, assigned_staff in shift_schedule.items():
+                    for staff_id in assigned_staff:
+                        if staff_id in booked:
+                            violations["double_booking"].append(
+                                f"Staff {staff_id} double-booked on {day} {shift_type}: "
+                                f"{booked[staff_id]} and {role}"
+                            )
+                        booked[staff_id] = role
+
+                        staff = self.staff_by_id.get(staff_id)
+                        if staff is None or role not in staff["assignedRolesInPriority"]:
+                            violations["qualification"].append(
+                                f"Staff {staff_id} not qualified for role {role}"
+                            )
+                        if staff_id in unavailable:
+                            violations["unavailability"].append(
+                                f"Unavailability constraint violated: {staff_id} on {day}"
+                            )
+                        hours_by_staff[staff_id] += hours
+
+        for staff_id, total_hours in hours_by_staff.items():
+            staff = self.staff_by_id.get(staff_id)
+            if staff is not None and total_hours > staff["maxHoursPerWeek"]:
+                violations["max_hours"].append(
+                    f"Staff {staff_id} exceeded max hours: {total_hours} > {staff['maxHoursPerWeek']}"
+                )
+        return violations
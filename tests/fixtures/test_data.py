@@ -1,7 +1,12 @@
 """
 Simplified test data fixtures for restaurant scheduling system.
 Focused on comprehensive logic coverage with minimal data complexity.
+
+The module-level constants are shared prototypes; the get_*_scenario()
+helpers hand out independent deep copies so tests can never leak edits
+into each other.
 """
+import copy
 
 # Standard shift definitions used across all tests
 STANDARD_SHIFT_DEFINITIONS = {
@@ -105,25 +110,28 @@ BASIC_STAFF_PRIORITY = [
 
 def get_basic_scenario():
     """Get the basic test scenario covering all core logic."""
-    return {
+    return copy.deepcopy({
         "staffList": MINIMAL_STAFF,
         "unavailabilityList": BASIC_UNAVAILABILITY,
         "weeklyNeeds": BASIC_WEEKLY_NEEDS,
         "shiftDefinitions": STANDARD_SHIFT_DEFINITIONS,
         "shiftPreference": "PRIORITIZE_FULL_DAYS",
         "staffPriority": BASIC_STAFF_PRIORITY
-    }
+    })
 
 def get_understaffed_scenario():
     """Get scenario with insufficient staff for testing shortage handling."""
-    return {
-        "staffList": MINIMAL_STAFF[:2],  # Only 2 staff for all needs
+    staff_list = MINIMAL_STAFF[:2]  # Only 2 staff for all needs
+    staff_ids = {staff["id"] for staff in staff_list}
+    return copy.deepcopy({
+        "staffList": staff_list,
         "unavailabilityList": [],
         "weeklyNeeds": BASIC_WEEKLY_NEEDS,
         "shiftDefinitions": STANDARD_SHIFT_DEFINITIONS,
         "shiftPreference": "NONE",
-        "staffPriority": BASIC_STAFF_PRIORITY[:2]
-    }
+        # Priority may only name staff in the list, or the API rejects it
+        "staffPriority": [s_id for s_id in BASIC_STAFF_PRIORITY if s_id in staff_ids]
+    })
 
 def get_overstaffed_scenario():
     """Get scenario with excess staff for testing priority optimization."""
@@ -138,7 +146,7 @@ def get_overstaffed_scenario():
         for i in range(1, 4)  # Add 3 extra staff
     ]
     
-    return {
+    return copy.deepcopy({
         "staffList": MINIMAL_STAFF + extra_staff,
         "unavailabilityList": [],
         "weeklyNeeds": {
@@ -148,7 +156,7 @@ def get_overstaffed_scenario():
         "shiftDefinitions": STANDARD_SHIFT_DEFINITIONS,
         "shiftPreference": "NONE", 
         "staffPriority": BASIC_STAFF_PRIORITY + [f"extra-{i:03d}" for i in range(1, 4)]
-    }
+    })
 
 def get_high_constraint_scenario():
     """Get scenario with many overlapping constraints."""
@@ -170,14 +178,14 @@ def get_high_constraint_scenario():
         }
     ]
     
-    return {
+    return copy.deepcopy({
         "staffList": MINIMAL_STAFF,
         "unavailabilityList": complex_unavailability,
         "weeklyNeeds": BASIC_WEEKLY_NEEDS,
         "shiftDefinitions": STANDARD_SHIFT_DEFINITIONS,
         "shiftPreference": "PRIORITIZE_FULL_DAYS",
         "staffPriority": BASIC_STAFF_PRIORITY
-    }
+    })
 
 # Invalid data for error testing
 INVALID_STAFF_EXAMPLES = [
@@ -3,16 +3,79 @@ Comprehensive API tests for restaurant scheduling system.
 Covers all HTTP endpoints, validation, error handling, and CORS.
 """
 import pytest
-import json
+from itertools import chain
 from fixtures.test_data import (
     get_basic_scenario,
     get_understaffed_scenario,
     INVALID_STAFF_EXAMPLES,
     INVALID_UNAVAILABILITY_EXAMPLES,
-    INVALID_WEEKLY_NEEDS_EXAMPLES,
-    STANDARD_SHIFT_DEFINITIONS
+    INVALID_WEEKLY_NEEDS_EXAMPLES
 )
 
+_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+_HALF_SHIFTS = ("HALF_DAY_AM", "HALF_DAY_PM")
+_REQUIRED_FIELDS = ("staffList", "unavailabilityList", "weeklyNeeds", "shiftDefinitions")
+_EXPECTED_ORIGINS = (
+    'restaurant-scheduler.jacobhung.dpdns.org',
+    'restaurant-scheduler-web.vercel.app'
+)
+
+
+def _case_ids(prefix, examples):
+    """Short stable parametrize ids instead of repr()-ing each payload."""
+    return [f"{prefix}-case{i}" for i in range(len(examples))]
+
+
+@pytest.fixture(scope="module")
+def basic_response(client, basic_scenario):
+    """Solve the basic scenario once and share (response, data) across tests."""
+    response = client.post('/api/schedule',
+                         json=basic_scenario,
+                         headers={'Origin': f'https://{_EXPECTED_ORIGINS[0]}'})
+    return response, response.get_json()
+
+
+@pytest.fixture(scope="module")
+def infeasible_scenario():
+    """Basic scenario where a staff member needs 40h but is unavailable all week."""
+    scenario = get_basic_scenario()
+    staff = dict(scenario["staffList"][0], minHoursPerWeek=40)
+    scenario["staffList"] = [staff] + scenario["staffList"][1:]
+    scenario["unavailabilityList"] = [
+        {
+            "employeeId": staff["id"],
+            "dayOfWeek": day,
+            "shifts": [{"start": "00:00", "end": "23:59"}]
+        }
+        for day in _DAYS
+    ]
+    return scenario
+
+
+@pytest.fixture(scope="module")
+def large_scenario():
+    """Basic scenario expanded with 10 extra Server staff."""
+    scenario = get_basic_scenario()
+    extra_staff = [
+        {
+            "name": f"Staff {i}",
+            "assignedRolesInPriority": ["Server"],
+            "minHoursPerWeek": 10,
+            "maxHoursPerWeek": 20,
+            "id": f"staff-{i:03d}"
+        }
+        for i in range(10)
+    ]
+    scenario["staffList"] = scenario["staffList"] + extra_staff
+    return scenario
+
+
+def _all_assignment_lists(schedule):
+    """Yield the assigned-staff list of every role in every shift and day."""
+    for day_schedule in schedule.values():
+        for shift_schedule in day_schedule.values():
+            yield from shift_schedule.values()
+
 
 class TestAPIEndpoints:
     """Test core API endpoint functionality."""
@@ -25,17 +88,12 @@ class TestAPIEndpoints:
         data = response.get_json()
         assert data == {"status": "ok", "service": "restaurant-schedule-backend"}
     
-    def test_valid_schedule_request(self, client):
+    def test_valid_schedule_request(self, basic_response):
         """Test successful schedule generation."""
-        scenario = get_basic_scenario()
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response, data = basic_response
         
         assert response.status_code == 200
         
-        data = response.get_json()
         assert data['success'] is True
         assert 'schedule' in data
         assert 'calculationTimeMs' in data
@@ -43,26 +101,22 @@ class TestAPIEndpoints:
         assert isinstance(data['schedule'], dict)
         assert data['calculationTimeMs'] > 0
     
-    def test_schedule_structure_validation(self, client):
+    def test_schedule_structure_validation(self, basic_response, basic_scenario):
         """Test that returned schedule has correct structure."""
-        scenario = get_basic_scenario()
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response, data = basic_response
         
         assert response.status_code == 200
-        data = response.get_json()
         schedule = data['schedule']
         
-        # Check day structure
-        expected_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        for day in expected_days:
-            assert day in schedule
-            
+        staff_ids = {s["id"] for s in basic_scenario["staffList"]}
+        
+        # Days nobody works are omitted, so only check the days present
+        assert schedule, "Schedule should not be empty"
+        assert set(schedule) <= set(_DAYS)
+        for day in _DAYS:
             # Check shift structure
-            day_schedule = schedule[day]
-            for shift_type in ["HALF_DAY_AM", "HALF_DAY_PM"]:
+            day_schedule = schedule.get(day, {})
+            for shift_type in _HALF_SHIFTS:
                 if shift_type in day_schedule:
                     shift_schedule = day_schedule[shift_type]
                     
@@ -70,48 +124,35 @@ class TestAPIEndpoints:
                     for role, assigned_staff in shift_schedule.items():
                         assert isinstance(assigned_staff, list)
                         # Verify all assigned staff exist in staff list
-                        staff_ids = [s["id"] for s in scenario["staffList"]]
-                        for staff_id in assigned_staff:
-                            assert staff_id in staff_ids
+                        assert set(assigned_staff) <= staff_ids
     
-    def test_cors_headers(self, client):
+    def test_cors_headers(self, basic_response):
         """Test CORS headers are set correctly."""
-        scenario = get_basic_scenario()
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response, _ = basic_response
         
-        assert 'Access-Control-Allow-Origin' in response.headers
         # Check that CORS allows expected origins
         cors_origin = response.headers.get('Access-Control-Allow-Origin')
-        expected_origins = [
-            'restaurant-scheduler.jacobhung.dpdns.org',
-            'restaurant-scheduler-web.vercel.app'
-        ]
+        assert cors_origin is not None
         # Should allow at least one expected origin or wildcard
-        assert any(origin in cors_origin for origin in expected_origins) or cors_origin == '*'
+        assert cors_origin == '*' or cors_origin.endswith(_EXPECTED_ORIGINS)
 
 
 class TestInputValidation:
     """Test input validation and error handling."""
     
-    def test_missing_required_fields(self, client):
+    @pytest.mark.parametrize("field", _REQUIRED_FIELDS)
+    def test_missing_required_fields(self, client, field):
         """Test error handling for missing required fields."""
-        required_fields = ["staffList", "unavailabilityList", "weeklyNeeds", "shiftDefinitions"]
-        
-        for field in required_fields:
-            scenario = get_basic_scenario()
-            del scenario[field]  # Remove required field
-            
-            response = client.post('/api/schedule',
-                                 data=json.dumps(scenario),
-                                 content_type='application/json')
-            
-            assert response.status_code == 400
-            data = response.get_json()
-            assert data['success'] is False
-            assert 'error' in data or 'message' in data
+        scenario = {
+            key: value for key, value in get_basic_scenario().items() if key != field
+        }
+        
+        response = client.post('/api/schedule', json=scenario)
+        
+        assert response.status_code == 400
+        data = response.get_json()
+        assert data['success'] is False
+        assert 'error' in data or 'message' in data
     
     def test_invalid_json_format(self, client):
         """Test error handling for malformed JSON."""
@@ -130,9 +171,7 @@ class TestInputValidation:
         scenario = get_basic_scenario()
         scenario["staffList"] = []
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         # Should either succeed with empty schedule or return 422
         assert response.status_code in [200, 422]
@@ -140,67 +179,54 @@ class TestInputValidation:
         data = response.get_json()
         if response.status_code == 200:
             # Empty staff should result in empty schedule
-            schedule = data['schedule']
-            total_assignments = sum(
-                len(staff_list)
-                for day_schedule in schedule.values()
-                for shift_schedule in day_schedule.values()
-                for staff_list in shift_schedule.values()
-            )
-            assert total_assignments == 0
+            assert sum(map(len, _all_assignment_lists(data['schedule']))) == 0
     
     def test_invalid_time_format(self, client):
         """Test handling of invalid time formats."""
         scenario = get_basic_scenario()
         scenario["shiftDefinitions"]["HALF_DAY_AM"]["start"] = "25:00"  # Invalid hour
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         assert response.status_code == 400
         data = response.get_json()
         assert data['success'] is False
     
-    @pytest.mark.parametrize("invalid_staff", INVALID_STAFF_EXAMPLES)
+    @pytest.mark.parametrize("invalid_staff", INVALID_STAFF_EXAMPLES,
+                             ids=_case_ids("staff", INVALID_STAFF_EXAMPLES))
     def test_invalid_staff_data(self, client, invalid_staff):
         """Test handling of various invalid staff data."""
         scenario = get_basic_scenario()
         scenario["staffList"] = [invalid_staff]
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         # Should handle gracefully - either work around or fail gracefully
         assert response.status_code in [200, 400, 422]
         
-        data = response.get_json()
         if response.status_code != 200:
-            assert data['success'] is False
+            assert response.get_json()['success'] is False
     
-    @pytest.mark.parametrize("invalid_unavail", INVALID_UNAVAILABILITY_EXAMPLES)
+    @pytest.mark.parametrize("invalid_unavail", INVALID_UNAVAILABILITY_EXAMPLES,
+                             ids=_case_ids("unavail", INVALID_UNAVAILABILITY_EXAMPLES))
     def test_invalid_unavailability_data(self, client, invalid_unavail):
         """Test handling of invalid unavailability data."""
         scenario = get_basic_scenario()
         scenario["unavailabilityList"] = [invalid_unavail]
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         # Should handle gracefully
         assert response.status_code in [200, 400, 422]
     
-    @pytest.mark.parametrize("invalid_needs", INVALID_WEEKLY_NEEDS_EXAMPLES)
+    @pytest.mark.parametrize("invalid_needs", INVALID_WEEKLY_NEEDS_EXAMPLES,
+                             ids=_case_ids("needs", INVALID_WEEKLY_NEEDS_EXAMPLES))
     def test_invalid_weekly_needs(self, client, invalid_needs):
         """Test handling of invalid weekly needs."""
         scenario = get_basic_scenario()
         scenario["weeklyNeeds"] = invalid_needs
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         assert response.status_code in [200, 400, 422]
 
@@ -212,9 +238,7 @@ class TestConstraintScenarios:
         """Test API handling of understaffed scenarios."""
         scenario = get_understaffed_scenario()
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         # Should handle gracefully - either 200 with warnings or 422
         assert response.status_code in [200, 422]
@@ -223,32 +247,15 @@ class TestConstraintScenarios:
         if response.status_code == 200:
             # Should have shortage warnings
             warnings = data.get('warnings', [])
-            shortage_warnings = [w for w in warnings if 'Shortage' in w]
-            assert len(shortage_warnings) > 0
+            assert any('Shortage' in w for w in warnings)
         else:
             # Should explain why scheduling failed
             assert data['success'] is False
             assert 'message' in data
     
-    def test_infeasible_constraints(self, client):
+    def test_infeasible_constraints(self, client, infeasible_scenario):
         """Test handling of impossible constraint combinations."""
-        scenario = get_basic_scenario()
-        
-        # Create impossible scenario - staff wants min hours but unavailable all week
-        staff_id = scenario["staffList"][0]["id"]
-        scenario["staffList"][0]["minHoursPerWeek"] = 40
-        scenario["unavailabilityList"] = [
-            {
-                "employeeId": staff_id,
-                "dayOfWeek": day,
-                "shifts": [{"start": "00:00", "end": "23:59"}]
-            }
-            for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        ]
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=infeasible_scenario)
         
         # Should either succeed with warnings or return 422
         assert response.status_code in [200, 422]
@@ -258,26 +265,11 @@ class TestConstraintScenarios:
             # Should have warnings about unmet constraints
             assert len(data.get('warnings', [])) > 0
     
-    def test_large_request_handling(self, client):
+    @pytest.mark.slow
+    @pytest.mark.xdist_group("slow")
+    def test_large_request_handling(self, client, large_scenario):
         """Test handling of reasonably large requests."""
-        scenario = get_basic_scenario()
-        
-        # Expand to moderate size
-        extra_staff = [
-            {
-                "name": f"Staff {i}",
-                "assignedRolesInPriority": ["Server"],
-                "minHoursPerWeek": 10,
-                "maxHoursPerWeek": 20,
-                "id": f"staff-{i:03d}"
-            }
-            for i in range(10)  # Add 10 more staff
-        ]
-        scenario["staffList"].extend(extra_staff)
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=large_scenario)
         
         assert response.status_code == 200
         data = response.get_json()
@@ -299,62 +291,41 @@ class TestShiftPreferences:
         scenario = get_basic_scenario()
         scenario["shiftPreference"] = preference
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         assert response.status_code == 200
         data = response.get_json()
         assert data['success'] is True
         
         # Should generate reasonable schedule
-        schedule = data['schedule']
-        total_assignments = sum(
-            len(staff_list)
-            for day_schedule in schedule.values()
-            for shift_schedule in day_schedule.values()
-            for staff_list in shift_schedule.values()
-        )
-        assert total_assignments > 0
+        assert any(_all_assignment_lists(data['schedule']))
 
 
 class TestStaffPriority:
     """Test staff priority handling."""
     
-    def test_staff_priority_ordering(self, client):
+    def test_staff_priority_ordering(self, basic_response, basic_scenario):
         """Test that staff priority affects scheduling."""
-        scenario = get_basic_scenario()
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response, data = basic_response
         
         assert response.status_code == 200
-        data = response.get_json()
         assert data['success'] is True
         
         # High priority staff should get some assignments
         schedule = data['schedule']
-        high_priority_staff = scenario["staffPriority"][:2]
+        high_priority_staff = basic_scenario["staffPriority"][:2]
         
-        assigned_staff = set()
-        for day_schedule in schedule.values():
-            for shift_schedule in day_schedule.values():
-                for staff_list in shift_schedule.values():
-                    assigned_staff.update(staff_list)
+        assigned_staff = set(chain.from_iterable(_all_assignment_lists(schedule)))
         
         # At least one high priority staff should be assigned
-        high_priority_assigned = len([s for s in high_priority_staff if s in assigned_staff])
-        assert high_priority_assigned > 0
+        assert not assigned_staff.isdisjoint(high_priority_staff)
     
     def test_empty_staff_priority(self, client):
         """Test handling of empty staff priority list."""
         scenario = get_basic_scenario()
         scenario["staffPriority"] = []
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         assert response.status_code == 200
         data = response.get_json()
@@ -364,27 +335,26 @@ class TestStaffPriority:
 class TestUnavailabilityConstraints:
     """Test unavailability constraint handling."""
     
-    def test_unavailability_respected(self, client):
+    def test_unavailability_respected(self, basic_response, basic_scenario):
         """Test that unavailability constraints are respected."""
-        scenario = get_basic_scenario()
-        
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response, data = basic_response
         
         assert response.status_code == 200
-        data = response.get_json()
         schedule = data['schedule']
         
         # Check that unavailability constraints are respected
-        for unavail in scenario["unavailabilityList"]:
-            staff_id = unavail["employeeId"]
-            day = unavail["dayOfWeek"]
-            
-            if day in schedule:
-                for shift_schedule in schedule[day].values():
-                    for staff_list in shift_schedule.values():
-                        assert staff_id not in staff_list, f"Unavailability violated: {staff_id} on {day}"
+        unavailable_by_day = {}
+        for unavail in basic_scenario["unavailabilityList"]:
+            unavailable_by_day.setdefault(unavail["dayOfWeek"], set()).add(unavail["employeeId"])
+        
+        for day, day_schedule in schedule.items():
+            unavailable_staff = unavailable_by_day.get(day)
+            if not unavailable_staff:
+                continue
+            for shift_schedule in day_schedule.values():
+                for staff_list in shift_schedule.values():
+                    violations = unavailable_staff.intersection(staff_list)
+                    assert not violations, f"Unavailability violated: {sorted(violations)} on {day}"
     
     def test_cross_day_unavailability(self, client):
         """Test handling of cross-day unavailability periods."""
@@ -397,9 +367,7 @@ class TestUnavailabilityConstraints:
             }
         ]
         
-        response = client.post('/api/schedule',
-                             data=json.dumps(scenario),
-                             content_type='application/json')
+        response = client.post('/api/schedule', json=scenario)
         
         # Should handle cross-day periods gracefully
         assert response.status_code == 200
@@ -3,6 +3,8 @@ Core business logic tests for restaurant scheduling system.
 Covers business rules, optimization objectives, and constraint satisfaction.
 """
 import pytest
+from itertools import chain
+from fixtures.schedule_validator import ScheduleValidator
 from fixtures.test_data import (
     get_basic_scenario,
     get_understaffed_scenario,
@@ -10,206 +12,150 @@ from fixtures.test_data import (
     get_high_constraint_scenario
 )
 from scheduler.solver import generate_schedule_with_ortools
-from scheduler.utils import calculate_total_weekly_hours
+from scheduler.utils import (
+    calculate_total_weekly_hours,
+    build_staff_hour_index,
+    freeze_schedule,
+    validate_schedule_shape,
+    build_shift_segments,
+    build_unavailability_index,
+    is_available,
+    _merge_segments,
+)
+
+
+def _assignment_lists(schedule):
+    """Iterate every per-role list of assigned staff IDs in a schedule."""
+    return chain.from_iterable(
+        shift_schedule.values()
+        for day_schedule in schedule.values()
+        for shift_schedule in day_schedule.values()
+    )
+
+
+def _total_assignments(schedule):
+    """Count every (staff, day, shift, role) assignment in a schedule."""
+    return sum(map(len, _assignment_lists(schedule)))
+
+
+def _all_assigned_staff_ids(schedule):
+    """Set of staff IDs assigned at least once anywhere in a schedule."""
+    return set(chain.from_iterable(_assignment_lists(schedule)))
+
+
+def _hit_time_limit(warnings):
+    """True if the solver stopped on its time limit instead of proving optimality."""
+    return any("Solver time limit reached" in w for w in warnings)
+
+
+def _fillable_demand(scenario, total_demand):
+    """Demand the staff could cover at most, given weekly max hours.
+    
+    Each staff member fills at most maxHoursPerWeek // shortest shift slots,
+    so coverage is judged against that ceiling rather than raw demand.
+    """
+    shortest_shift = min(info["hours"] for info in scenario["shiftDefinitions"].values())
+    capacity = sum(
+        int(staff["maxHoursPerWeek"] // shortest_shift) for staff in scenario["staffList"]
+    )
+    return min(total_demand, capacity)
+
+
+def _demand_cells(weekly_needs):
+    """Flatten weekly needs into (day, shift_type, role, needed_count) tuples."""
+    return [
+        (day, shift_type, role, needed_count)
+        for day, day_needs in weekly_needs.items()
+        for shift_type, role_needs in day_needs.items()
+        for role, needed_count in role_needs.items()
+    ]
+
+
+def _covered_demand(schedule, demand_cells):
+    """Count assignments that fill a demanded slot, capped per slot at its need."""
+    return sum(
+        min(len(schedule.get(day, {}).get(shift_type, {}).get(role, ())), needed_count)
+        for day, shift_type, role, needed_count in demand_cells
+    )
 
 
 class TestBasicBusinessRules:
     """Test fundamental business rule enforcement."""
     
-    def test_basic_schedule_generation(self):
+    def test_basic_schedule_generation(self, solved_basic):
         """Test that basic scheduling works correctly."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, calc_time = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule, warnings, calc_time = solved_basic
         
         assert schedule is not None, "Should generate schedule for feasible scenario"
         assert calc_time > 0, "Should record calculation time"
         assert isinstance(warnings, list), "Should return warnings list"
         
-        # Verify schedule structure
+        # Verify schedule structure; days nobody works are omitted
         expected_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        for day in expected_days:
-            assert day in schedule, f"Schedule should include {day}"
+        assert schedule, "Schedule should contain at least one working day"
+        for day in schedule:
+            assert day in expected_days, f"Unexpected day in schedule: {day}"
     
-    def test_no_double_booking(self):
-        """Test that no staff member is double-booked on same day."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
-        
-        assert schedule is not None
-        
-        # Check for double booking
-        for day, day_schedule in schedule.items():
-            staff_assignments = {}
-            
-            for shift_type, shift_schedule in day_schedule.items():
-                for role, assigned_staff in shift_schedule.items():
-                    for staff_id in assigned_staff:
-                        assert staff_id not in staff_assignments, \
-                            f"Staff {staff_id} double-booked on {day}: {staff_assignments.get(staff_id)} and {shift_type}:{role}"
-                        staff_assignments[staff_id] = f"{shift_type}:{role}"
+    def test_no_double_booking(self, basic_violations):
+        """Test that no staff member holds two roles in the same shift."""
+        assert not basic_violations["double_booking"], basic_violations["double_booking"]
     
-    def test_max_hours_not_exceeded(self):
+    def test_max_hours_not_exceeded(self, basic_violations):
         """Test that staff don't exceed maximum weekly hours."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
-        
-        assert schedule is not None
-        
-        for staff in scenario["staffList"]:
-            staff_id = staff["id"]
-            total_hours = calculate_total_weekly_hours(staff_id, schedule, scenario["shiftDefinitions"])
-            assert total_hours <= staff["maxHoursPerWeek"], \
-                f"Staff {staff_id} exceeded max hours: {total_hours} > {staff['maxHoursPerWeek']}"
+        assert not basic_violations["max_hours"], basic_violations["max_hours"]
     
-    def test_role_qualification_enforcement(self):
+    def test_role_qualification_enforcement(self, basic_violations):
         """Test that staff are only assigned to qualified roles."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
-        
-        assert schedule is not None
-        
-        # Create staff qualification lookup
-        staff_qualifications = {staff["id"]: staff["assignedRolesInPriority"] for staff in scenario["staffList"]}
-        
-        for day_schedule in schedule.values():
-            for shift_schedule in day_schedule.values():
-                for role, assigned_staff in shift_schedule.items():
-                    for staff_id in assigned_staff:
-                        assert role in staff_qualifications[staff_id], \
-                            f"Staff {staff_id} not qualified for role {role}"
+        assert not basic_violations["qualification"], basic_violations["qualification"]
     
-    def test_unavailability_constraints_respected(self):
+    def test_unavailability_constraints_respected(self, basic_violations):
         """Test that unavailability constraints are strictly enforced."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
-        
-        assert schedule is not None
-        
-        # Check each unavailability constraint
-        for unavail in scenario["unavailabilityList"]:
-            staff_id = unavail["employeeId"]
-            day = unavail["dayOfWeek"]
-            
-            if day in schedule:
-                for shift_schedule in schedule[day].values():
-                    for assigned_staff in shift_schedule.values():
-                        assert staff_id not in assigned_staff, \
-                            f"Unavailability constraint violated: {staff_id} on {day}"
+        assert not basic_violations["unavailability"], basic_violations["unavailability"]
 
 
+@pytest.mark.slow
 class TestOptimizationObjectives:
     """Test the 5-level optimization objective hierarchy."""
     
-    def test_demand_shortage_minimization_priority(self):
+    @pytest.mark.parametrize("preference", ["PRIORITIZE_FULL_DAYS", "PRIORITIZE_HALF_DAYS", "NONE"])
+    def test_demand_shortage_minimization_priority(self, solve, preference):
         """Test demand shortage minimization (weight: 10,000 - highest priority)."""
         scenario = get_basic_scenario()
         
-        # Test with different shift preferences - demand coverage should be consistent
-        demand_coverages = []
-        for preference in ["PRIORITIZE_FULL_DAYS", "PRIORITIZE_HALF_DAYS", "NONE"]:
-            scenario["shiftPreference"] = preference
-            
-            schedule, warnings, _ = generate_schedule_with_ortools(
-                scenario["weeklyNeeds"],
-                scenario["staffList"],
-                scenario["unavailabilityList"],
-                scenario["shiftDefinitions"],
-                scenario["shiftPreference"],
-                scenario["staffPriority"]
-            )
-            
-            if schedule is not None:
-                # Calculate demand coverage
-                total_demand = 0
-                total_covered = 0
-                
-                for day, day_needs in scenario["weeklyNeeds"].items():
-                    for shift_type, role_needs in day_needs.items():
-                        for role, needed_count in role_needs.items():
-                            total_demand += needed_count
-                            
-                            if (day in schedule and 
-                                shift_type in schedule[day] and 
-                                role in schedule[day][shift_type]):
-                                covered_count = len(schedule[day][shift_type][role])
-                                total_covered += min(covered_count, needed_count)
-                
-                coverage_rate = total_covered / total_demand if total_demand > 0 else 0
-                demand_coverages.append(coverage_rate)
+        # Demand coverage should hold whichever shift preference is active
+        scenario["shiftPreference"] = preference
+        demand_cells = _demand_cells(scenario["weeklyNeeds"])
+        fillable_demand = _fillable_demand(scenario, sum(cell[3] for cell in demand_cells))
+        
+        schedule, warnings, _ = solve(scenario)
         
-        # Demand coverage should be consistently prioritized
-        if demand_coverages:
-            avg_coverage = sum(demand_coverages) / len(demand_coverages)
-            assert avg_coverage >= 0.7, f"Demand coverage should be prioritized: {avg_coverage:.2%}"
+        if schedule is not None:
+            total_covered = _covered_demand(schedule, demand_cells)
+            coverage_rate = total_covered / fillable_demand if fillable_demand > 0 else 0
+            assert coverage_rate >= 0.7, \
+                f"Demand coverage should be prioritized under {preference}: {coverage_rate:.2%}"
     
-    def test_min_hour_shortage_minimization(self):
+    def test_min_hour_shortage_minimization(self, solve):
         """Test minimum hour shortage minimization (weight: 2,000)."""
         scenario = get_basic_scenario()
         
         # Set high minimum hours for some staff
-        for staff in scenario["staffList"][:2]:
-            staff["minHoursPerWeek"] = 30
+        scenario["staffList"] = [
+            {**staff, "minHoursPerWeek": 30} if index < 2 else staff
+            for index, staff in enumerate(scenario["staffList"])
+        ]
         
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],  
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule, warnings, _ = solve(scenario)
         
         if schedule is not None:
             # Check if high-min-hour staff get more hours
             high_min_staff = scenario["staffList"][:2]
             other_staff = scenario["staffList"][2:]
             
-            high_min_hours = [
-                calculate_total_weekly_hours(staff["id"], schedule, scenario["shiftDefinitions"])
-                for staff in high_min_staff
-            ]
+            hours_by_staff = build_staff_hour_index(schedule, scenario["shiftDefinitions"])
+            high_min_hours = [hours_by_staff.get(staff["id"], 0.0) for staff in high_min_staff]
             other_hours = [
-                calculate_total_weekly_hours(staff["id"], schedule, scenario["shiftDefinitions"])
+                hours_by_staff.get(staff["id"], 0.0)
                 for staff in other_staff[:2]  # Compare with first 2 others
             ]
             
@@ -221,45 +167,25 @@ class TestOptimizationObjectives:
                 assert avg_high_min >= avg_other * 0.8, \
                     f"Min hour optimization should work: {avg_high_min:.1f} vs {avg_other:.1f}"
     
-    def test_shift_preference_optimization(self):
+    def test_shift_preference_optimization(self, solve):
         """Test shift preference optimization (weight: 100)."""
         scenario = get_basic_scenario()
         
         # Test PRIORITIZE_FULL_DAYS
         scenario["shiftPreference"] = "PRIORITIZE_FULL_DAYS"
-        schedule_full_days, _, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule_full_days, _, _ = solve(scenario)
         
-        # Test PRIORITIZE_HALF_DAYS
+        # Test PRIORITIZE_HALF_DAYS, warm-started from the full-days schedule
         scenario["shiftPreference"] = "PRIORITIZE_HALF_DAYS"
-        schedule_half_days, _, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule_half_days, _, _ = solve(scenario, hint_schedule=schedule_full_days)
         
         if schedule_full_days is not None and schedule_half_days is not None:
             def count_full_day_assignments(schedule):
                 full_day_count = 0
                 for day, day_schedule in schedule.items():
                     if "HALF_DAY_AM" in day_schedule and "HALF_DAY_PM" in day_schedule:
-                        am_staff = set()
-                        pm_staff = set()
-                        
-                        for role_assignments in day_schedule["HALF_DAY_AM"].values():
-                            am_staff.update(role_assignments)
-                        for role_assignments in day_schedule["HALF_DAY_PM"].values():
-                            pm_staff.update(role_assignments)
-                        
+                        am_staff = set().union(*day_schedule["HALF_DAY_AM"].values())
+                        pm_staff = set().union(*day_schedule["HALF_DAY_PM"].values())
                         full_day_count += len(am_staff & pm_staff)
                 return full_day_count
             
@@ -270,65 +196,47 @@ class TestOptimizationObjectives:
             assert full_day_pref_full_days >= half_day_pref_full_days - 1, \
                 "Shift preferences should influence scheduling"
     
-    def test_staff_priority_optimization(self):
+    def test_staff_priority_optimization(self, solve):
         """Test staff priority optimization (weight: 20)."""
         scenario = get_overstaffed_scenario()  # Use overstaffed to see priority effects
         
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"], 
-            scenario["staffPriority"]
-        )
+        schedule, warnings, _ = solve(scenario)
         
         if schedule is not None:
             # Check that high priority staff get assigned preferentially
-            high_priority_staff = scenario["staffPriority"][:3]  # Top 3
-            low_priority_staff = scenario["staffPriority"][-3:]  # Bottom 3
+            high_priority_staff = frozenset(scenario["staffPriority"][:3])  # Top 3
+            low_priority_staff = frozenset(scenario["staffPriority"][-3:])  # Bottom 3
             
-            assigned_staff = set()
-            for day_schedule in schedule.values():
-                for shift_schedule in day_schedule.values():
-                    for staff_list in shift_schedule.values():
-                        assigned_staff.update(staff_list)
+            assigned_staff = _all_assigned_staff_ids(schedule)
             
-            high_priority_assigned = len([s for s in high_priority_staff if s in assigned_staff])
-            low_priority_assigned = len([s for s in low_priority_staff if s in assigned_staff])
+            high_priority_assigned = len(high_priority_staff & assigned_staff)
+            low_priority_assigned = len(low_priority_staff & assigned_staff)
             
             # High priority staff should be more likely to be assigned
             assert high_priority_assigned >= low_priority_assigned, \
                 f"Staff priority should affect assignment: {high_priority_assigned} vs {low_priority_assigned}"
     
-    def test_role_preference_optimization(self):
+    def test_role_preference_optimization(self, solved_basic, staff_by_id):
         """Test role preference optimization (weight: 10 - lowest priority)."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule, warnings, _ = solved_basic
         
         if schedule is not None:
-            # Check role preference satisfaction
+            # Check role preference satisfaction against each role's top-choice staff
+            top_choice_staff = {}
+            for staff_id, staff in staff_by_id.items():
+                top_choice_staff.setdefault(staff["assignedRolesInPriority"][0], set()).add(staff_id)
+            top_choice_staff = {role: frozenset(ids) for role, ids in top_choice_staff.items()}
+            
             role_preference_matches = 0
             total_assignments = 0
             
             for day_schedule in schedule.values():
                 for shift_schedule in day_schedule.values():
                     for role, assigned_staff in shift_schedule.items():
-                        for staff_id in assigned_staff:
-                            total_assignments += 1
-                            
-                            # Find staff member and check if role is their top preference
-                            staff_member = next(s for s in scenario["staffList"] if s["id"] == staff_id)
-                            if role == staff_member["assignedRolesInPriority"][0]:
-                                role_preference_matches += 1
+                        total_assignments += len(assigned_staff)
+                        role_preference_matches += len(
+                            top_choice_staff.get(role, frozenset()).intersection(assigned_staff)
+                        )
             
             if total_assignments > 0:
                 preference_rate = role_preference_matches / total_assignments
@@ -339,18 +247,11 @@ class TestOptimizationObjectives:
 class TestConstraintScenarios:
     """Test various constraint scenarios and edge cases."""
     
-    def test_understaffed_scenario_handling(self):
+    def test_understaffed_scenario_handling(self, solve):
         """Test system behavior with insufficient staff."""
         scenario = get_understaffed_scenario()
         
-        schedule, warnings, calc_time = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule, warnings, calc_time = solve(scenario, max_time_ms=25000)
         
         # Should either generate partial schedule or return None with warnings
         if schedule is not None:
@@ -359,70 +260,94 @@ class TestConstraintScenarios:
             assert len(shortage_warnings) > 0, "Should have shortage warnings for understaffed scenario"
             
             # Schedule should be limited due to staff constraints
-            total_assignments = sum(
-                len(staff_list)
-                for day_schedule in schedule.values()
-                for shift_schedule in day_schedule.values()
-                for staff_list in shift_schedule.values()
-            )
+            total_assignments = _total_assignments(schedule)
             # With only 2 staff, assignments should be limited
             assert total_assignments < 20, f"Understaffed should have limited assignments: {total_assignments}"
         else:
             # If no schedule, should have explanatory warnings
             assert len(warnings) > 0, "Should have warnings explaining why scheduling failed"
         
-        # Should complete within reasonable time
+        # Should prove optimality well before the cap, within reasonable time
+        assert not _hit_time_limit(warnings), "Understaffed solve should finish before its time cap"
         assert calc_time < 30000, "Understaffed scenario should complete quickly"
     
-    def test_high_constraint_scenario_feasibility(self):
-        """Test system behavior with many overlapping constraints."""
-        scenario = get_high_constraint_scenario()
+    def test_demand_above_headcount_reports_shortage(self):
+        """Test that demand exceeding total staff yields shortages, not infeasibility."""
+        scenario = get_basic_scenario()
+        staff_list = [scenario["staffList"][1]]  # Only Server Bob
+        weekly_needs = {"Monday": {"HALF_DAY_AM": {"Server": 5}}}
         
-        schedule, warnings, calc_time = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
+        schedule, warnings, _ = generate_schedule_with_ortools(
+            weekly_needs,
+            staff_list,
+            [],
             scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
+            "NONE",
+            []
         )
         
+        assert schedule is not None, "Demand above headcount should still be feasible"
+        assert schedule["Monday"]["HALF_DAY_AM"]["Server"] == ["bob-srv-002"]
+        assert "Warning: Shortage of 4 for Server on Monday HALF_DAY_AM." in warnings
+    
+    def test_malformed_hint_schedule_is_ignored(self):
+        """Test that bad leaves in a hint schedule are skipped instead of raising."""
+        scenario = get_basic_scenario()
+        staff_list = [scenario["staffList"][1]]  # Only Server Bob
+        weekly_needs = {"Monday": {"HALF_DAY_AM": {"Server": 1}}}
+        hint_schedule = {
+            "Monday": {
+                "HALF_DAY_AM": {"Server": None, "Cashier": [["bob-srv-002"], None]},
+                "HALF_DAY_PM": {"Server": ("bob-srv-002",)}
+            }
+        }
+        
+        schedule, warnings, _ = generate_schedule_with_ortools(
+            weekly_needs,
+            staff_list,
+            [],
+            scenario["shiftDefinitions"],
+            "NONE",
+            [],
+            hint_schedule=hint_schedule
+        )
+        
+        assert schedule is not None
+        assert schedule["Monday"]["HALF_DAY_AM"]["Server"] == ["bob-srv-002"]
+    
+    @pytest.mark.slow
+    def test_high_constraint_scenario_feasibility(self, solve):
+        """Test system behavior with many overlapping constraints."""
+        scenario = get_high_constraint_scenario()
+        
+        schedule, warnings, calc_time = solve(scenario, max_time_ms=55000)
+        
         # System should handle high constraints gracefully
         if schedule is not None:
             # Verify all hard constraints are satisfied
-            for unavail in scenario["unavailabilityList"]:
-                staff_id = unavail["employeeId"]
-                day = unavail["dayOfWeek"]
-                
-                if day in schedule:
-                    for shift_schedule in schedule[day].values():
-                        for assigned_staff in shift_schedule.values():
-                            assert staff_id not in assigned_staff, \
-                                f"Unavailability constraint violated: {staff_id} on {day}"
+            violations = ScheduleValidator(schedule, scenario).violations
+            assert not violations["unavailability"], violations["unavailability"]
         
-        # Should complete within reasonable time
+        # Should prove optimality well before the cap, within reasonable time
+        assert not _hit_time_limit(warnings), "High constraint solve should finish before its time cap"
         assert calc_time < 60000, "High constraint scenario should complete within 1 minute"
     
-    def test_optimization_hierarchy_integration(self):
+    @pytest.mark.slow
+    def test_optimization_hierarchy_integration(self, solve):
         """Test that all optimization objectives work together correctly."""
         scenario = get_basic_scenario()
         
         # Create scenario that tests priority conflicts
         # 1. High min hours to create min hour pressure
-        for staff in scenario["staffList"][:2]:
-            staff["minHoursPerWeek"] = 30
+        scenario["staffList"] = [
+            {**staff, "minHoursPerWeek": 30} if index < 2 else staff
+            for index, staff in enumerate(scenario["staffList"])
+        ]
         
         # 2. Set shift preference
         scenario["shiftPreference"] = "PRIORITIZE_FULL_DAYS"
         
-        schedule, warnings, _ = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule, warnings, _ = solve(scenario)
         
         if schedule is not None:
             # 1. Demand coverage should be prioritized
@@ -432,22 +357,19 @@ class TestConstraintScenarios:
                 for role_needs in day_needs.values()
             )
             
-            total_assignments = sum(
-                len(staff_list)
-                for day_schedule in schedule.values()
-                for shift_schedule in day_schedule.values()
-                for staff_list in shift_schedule.values()
-            )
+            total_assignments = _total_assignments(schedule)
+            fillable_demand = _fillable_demand(scenario, total_demand)
             
-            coverage_rate = total_assignments / total_demand if total_demand > 0 else 0
+            coverage_rate = total_assignments / fillable_demand if fillable_demand > 0 else 0
             assert coverage_rate >= 0.5, f"Should maintain reasonable demand coverage: {coverage_rate:.2%}"
             
             # 2. Should try to satisfy min hours for high-min-hour staff
             high_min_staff = scenario["staffList"][:2]
             min_hour_satisfaction = 0
+            hours_by_staff = build_staff_hour_index(schedule, scenario["shiftDefinitions"])
             
             for staff in high_min_staff:
-                actual_hours = calculate_total_weekly_hours(staff["id"], schedule, scenario["shiftDefinitions"])
+                actual_hours = hours_by_staff.get(staff["id"], 0.0)
                 if actual_hours >= staff["minHoursPerWeek"] * 0.7:  # Within 70% of minimum
                     min_hour_satisfaction += 1
             
@@ -460,68 +382,127 @@ class TestConstraintScenarios:
 class TestScheduleQuality:
     """Test overall schedule quality and consistency."""
     
-    def test_schedule_consistency(self):
-        """Test that repeated runs produce consistent results."""
+    @pytest.mark.slow
+    def test_schedule_consistency(self, solve):
+        """Test that repeated runs with a fixed seed produce identical results."""
         scenario = get_basic_scenario()
         
-        # Run same scenario multiple times
+        # One search worker plus a fixed seed makes CP-SAT fully deterministic
         schedules = []
-        for i in range(3):
-            schedule, warnings, calc_time = generate_schedule_with_ortools(
-                scenario["weeklyNeeds"],
-                scenario["staffList"],
-                scenario["unavailabilityList"],
-                scenario["shiftDefinitions"],
-                scenario["shiftPreference"],
-                scenario["staffPriority"]
+        for i in range(2):
+            schedule, warnings, calc_time = solve(
+                scenario, max_time_ms=25000, random_seed=1, num_workers=1
             )
-            
-            if schedule is not None:
-                schedules.append(schedule)
-                # Should complete within reasonable time
-                assert calc_time < 30000, f"Run {i} should complete within 30 seconds"
-        
-        if len(schedules) >= 2:
-            # Check that solutions are reasonably similar
-            def count_assignments(schedule):
-                return sum(
-                    len(staff_list)
-                    for day_schedule in schedule.values()
-                    for shift_schedule in day_schedule.values()
-                    for staff_list in shift_schedule.values()
-                )
-            
-            assignment_counts = [count_assignments(schedule) for schedule in schedules]
-            
-            if assignment_counts:
-                min_assignments = min(assignment_counts)
-                max_assignments = max(assignment_counts)
-                if min_assignments > 0:
-                    similarity = min_assignments / max_assignments
-                    assert similarity >= 0.8, f"Repeated runs should be reasonably consistent: {similarity:.2%}"
+            assert schedule is not None, f"Run {i} should produce a schedule"
+            # Should prove optimality well before the cap, within reasonable time
+            assert not _hit_time_limit(warnings), f"Run {i} should finish before its time cap"
+            assert calc_time < 30000, f"Run {i} should complete within 30 seconds"
+            schedules.append(schedule)
+        
+        assert schedules[0] == schedules[1], "Repeated seeded runs should produce the same schedule"
     
-    def test_performance_within_bounds(self):
+    def test_performance_within_bounds(self, solved_basic):
         """Test that scheduling completes within reasonable time bounds."""
-        scenario = get_basic_scenario()
-        
-        schedule, warnings, calc_time = generate_schedule_with_ortools(
-            scenario["weeklyNeeds"],
-            scenario["staffList"],
-            scenario["unavailabilityList"],
-            scenario["shiftDefinitions"],
-            scenario["shiftPreference"],
-            scenario["staffPriority"]
-        )
+        schedule, warnings, calc_time = solved_basic
         
-        # Should complete quickly for basic scenario
+        # Should prove optimality before the 8s cap, so quality tests sharing
+        # this solve see an optimal schedule
+        assert not _hit_time_limit(warnings), "Basic solve should finish before its time cap"
         assert calc_time < 10000, f"Basic scenario should solve within 10 seconds: {calc_time}ms"
         
         if schedule is not None:
             # Should generate reasonable number of assignments
-            total_assignments = sum(
-                len(staff_list)
-                for day_schedule in schedule.values()
-                for shift_schedule in day_schedule.values()
-                for staff_list in shift_schedule.values()
+            total_assignments = _total_assignments(schedule)
+            assert total_assignments >= 10, f"Should generate substantial assignments: {total_assignments}"
+
+
+class TestSchedulerUtils:
+    """Unit tests for the scheduling helpers in scheduler.utils."""
+    
+    def test_staff_hour_index_matches_weekly_hours(self):
+        """Test that the one-pass hour index agrees with per-staff totals."""
+        scenario = get_basic_scenario()
+        schedule = {
+            "Monday": {
+                "HALF_DAY_AM": {"Server": ["alice-mgr-001"], "Cashier": ["carol-csh-003"]},
+                "HALF_DAY_PM": {"Server": ["alice-mgr-001", "bob-srv-002"]}
+            },
+            "Sunday": {
+                "HALF_DAY_PM": {"Expo": ["dave-exp-004"]}
+            }
+        }
+        
+        hours_by_staff = build_staff_hour_index(schedule, scenario["shiftDefinitions"])
+        
+        for staff in scenario["staffList"]:
+            staff_id = staff["id"]
+            assert hours_by_staff.get(staff_id, 0.0) == calculate_total_weekly_hours(
+                staff_id, schedule, scenario["shiftDefinitions"]
             )
-            assert total_assignments >= 10, f"Should generate substantial assignments: {total_assignments}"
\ No newline at end of file
+        assert hours_by_staff["alice-mgr-001"] == 14
+        
+        frozen_schedule = freeze_schedule(schedule)
+        assert build_staff_hour_index(
+            frozen_schedule, scenario["shiftDefinitions"]
+        ) == hours_by_staff
+        for staff_id, hours in hours_by_staff.items():
+            assert calculate_total_weekly_hours(
+                staff_id, frozen_schedule, scenario["shiftDefinitions"]
+            ) == hours
+
+    def test_weekly_hours_tolerate_malformed_schedule(self):
+        """Test that malformed schedule branches fail shape validation and are skipped in totals."""
+        scenario = get_basic_scenario()
+        schedule = {
+            "Monday": {
+                "HALF_DAY_AM": {"Server": ["alice-mgr-001"], "Cashier": "alice-mgr-001"},
+                "HALF_DAY_PM": ["alice-mgr-001"]
+            },
+            "Tuesday": {
+                "HALF_DAY_AM": {"Server": ["alice-mgr-001"]}
+            }
+        }
+        
+        is_valid_shape, error_msg = validate_schedule_shape(schedule)
+        assert not is_valid_shape
+        assert error_msg
+        assert validate_schedule_shape(freeze_schedule(schedule)) == (True, None)
+        # Only the two well-formed AM Server slots count (7h each)
+        assert calculate_total_weekly_hours(
+            "alice-mgr-001", schedule, scenario["shiftDefinitions"]
+        ) == 14.0
+
+    def test_is_available_handles_cross_day_spans(self):
+        """Test availability checks against same-day and cross-day spans."""
+        unavailability_index = build_unavailability_index([
+            {
+                "employeeId": "bob-srv-002",
+                "dayOfWeek": "Monday",
+                "shifts": [{"start": "22:00", "end": "01:00"}]
+            },
+            {
+                "employeeId": "carol-srv-003",
+                "dayOfWeek": "Monday",
+                "shifts": [{"start": "12:00", "end": "14:00"}]
+            }
+        ])
+        shift_segments = build_shift_segments({
+            "HALF_DAY_AM": {"start": "12:00", "end": "19:00", "hours": 7.0},
+            "HALF_DAY_PM": {"start": "19:00", "end": "02:00", "hours": 7.0}
+        })
+        am = shift_segments["HALF_DAY_AM"]
+        pm = shift_segments["HALF_DAY_PM"]
+        
+        assert is_available("bob-srv-002", "Monday", am, unavailability_index)
+        assert not is_available("bob-srv-002", "Monday", pm, unavailability_index)
+        assert not is_available("carol-srv-003", "Monday", am, unavailability_index)
+        assert is_available("carol-srv-003", "Monday", pm, unavailability_index)
+        assert is_available("carol-srv-003", "Tuesday", am, unavailability_index)
+
+    def test_merge_segments_joins_overlapping_and_touching_spans(self):
+        """Test that overlapping and touching segments merge, gaps stay split."""
+        assert _merge_segments([(600, 720), (0, 60), (700, 800), (800, 900), (1000, 1100)]) == [
+            (0, 60), (600, 900), (1000, 1100)
+        ]
+        # Contained and empty segments add nothing
+        assert _merge_segments([(100, 500), (200, 300), (400, 400)]) == [(100, 500)]